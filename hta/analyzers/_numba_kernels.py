@@ -0,0 +1,43 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Optional Numba-compiled kernels for the trace counter analyses.
+
+Numba is not a required dependency of HTA. When it is not installed, HAS_NUMBA is
+False and callers are expected to fall back to their NumPy implementation.
+"""
+
+import numpy as np
+
+try:
+    import numba
+
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+if HAS_NUMBA:
+
+    @numba.njit(cache=True, nogil=True)
+    def grouped_cumsum(
+        codes: np.ndarray, values: np.ndarray, n_groups: int, out: np.ndarray
+    ) -> None:
+        """
+        Single pass cumulative sum of values per group, keeping one running counter
+        per group. Compiled with nogil so that ranks processed by the thread pool in
+        TraceCounters run concurrently.
+
+        Args:
+            codes (np.ndarray): dense group id in [0, n_groups) for each row.
+            values (np.ndarray): values to accumulate.
+            n_groups (int): number of distinct groups.
+            out (np.ndarray): output array, its dtype is used for the accumulators.
+        """
+        counters = np.zeros(n_groups, dtype=out.dtype)
+        for i in range(len(values)):
+            c = codes[i]
+            counters[c] += values[i]
+            out[i] = counters[c]
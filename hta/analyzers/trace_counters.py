@@ -2,24 +2,180 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-from typing import Dict, List, Optional
+import multiprocessing as mp
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, TypeVar
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 
+from hta.analyzers import _numba_kernels
 from hta.common.trace import Trace
 from hta.configs.config import logger
+from hta.utils.checker import is_valid_directory
 from hta.utils.utils import get_kernel_type, get_memory_kernel_type, KernelType
 
+T = TypeVar("T")
+
+
+def _grouped_cumsum(
+    keys: np.ndarray, values: np.ndarray, dtype: Optional[npt.DTypeLike] = None
+) -> np.ndarray:
+    """
+    Computes the cumulative sum of values within each group of keys, preserving the
+    row order within a group. Equivalent to Series.groupby(keys).cumsum() but works
+    on the rows ordered by key: integers use a single prefix sum, floats a prefix
+    sum per group. Uses a single pass Numba kernel when Numba is installed.
+
+    Args:
+        keys (np.ndarray): group key of each row.
+        values (np.ndarray): values to accumulate.
+        dtype (npt.DTypeLike): accumulator and result type, e.g. np.int32. Defaults
+            to the type np.cumsum() would use for values.
+
+    Returns:
+        np.ndarray
+            The per-group cumulative sum, aligned with the input rows.
+    """
+    if dtype is None:
+        dtype = np.cumsum(values[:0]).dtype
+    if len(values) == 0:
+        return values.astype(dtype)
+    if _numba_kernels.HAS_NUMBA:
+        codes, uniques = pd.factorize(keys)
+        out = np.empty(len(values), dtype=dtype)
+        _numba_kernels.grouped_cumsum(codes, values, len(uniques), out)
+        return out
+
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    sorted_values = values[order]
+    boundary = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+
+    if np.issubdtype(dtype, np.integer):
+        # subtract the running total at the start of each group from its rows,
+        # exact for integers
+        csum = np.cumsum(sorted_values, dtype=dtype)
+        group_start = np.maximum.accumulate(
+            np.where(boundary, np.arange(len(sorted_keys)), 0)
+        )
+        sorted_result = csum - (csum - sorted_values)[group_start]
+    else:
+        # a global prefix sum would carry float round-off from earlier groups into
+        # later ones, so accumulate each (contiguous) group on its own
+        sorted_result = np.empty(len(sorted_values), dtype=dtype)
+        bounds = np.append(np.flatnonzero(boundary), len(sorted_values))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            np.cumsum(sorted_values[start:end], out=sorted_result[start:end])
+
+    result = np.empty_like(sorted_result)
+    result[order] = sorted_result
+    return result
+
 
 class TraceCounters:
     def __init__(self):
         pass
 
+    @classmethod
+    def _get_time_series_for_ranks(
+        cls,
+        t: "Trace",
+        ranks: List[int],
+        time_series_fn: Callable[["Trace", int, Optional[pd.DataFrame]], Optional[T]],
+    ) -> Dict[int, T]:
+        """
+        Runs a per-rank time series function over the requested ranks in a thread pool.
+        The ranks are independent and most of the work happens in pandas/NumPy code
+        that releases the GIL.
+
+        Args:
+            t (Trace): Input trace data structure.
+            ranks (list of int): ranks to generate the time series for.
+            time_series_fn (Callable): per-rank function taking (t, rank, trace_df).
+
+        Returns:
+            Dict[int, T]
+                A dictionary of rank -> result of time_series_fn, skipping ranks
+                without a result.
+        """
+        # fetch the traces serially, only the compute is dispatched to the pool
+        traces = {rank: t.get_trace(rank) for rank in ranks}
+        with ThreadPoolExecutor(max_workers=min(len(ranks), mp.cpu_count())) as ex:
+            result = dict(
+                zip(
+                    ranks,
+                    ex.map(lambda rank: time_series_fn(t, rank, traces[rank]), ranks),
+                )
+            )
+        return {rank: value for rank, value in result.items() if value is not None}
+
+    @classmethod
+    def _write_time_series_for_ranks(
+        cls,
+        t: "Trace",
+        ranks: List[int],
+        time_series_fn: Callable[
+            ["Trace", int, Optional[pd.DataFrame]], Optional[pd.DataFrame]
+        ],
+        output_dir: str,
+        file_prefix: str,
+    ) -> Dict[int, str]:
+        """
+        Like _get_time_series_for_ranks, but writes each rank's time series to
+        `<output_dir>/<file_prefix>_rank<rank>.parquet` as soon as it is computed,
+        so memory does not grow with the number of ranks.
+
+        Args:
+            t (Trace): Input trace data structure.
+            ranks (list of int): ranks to generate the time series for.
+            time_series_fn (Callable): per-rank function taking (t, rank, trace_df).
+            output_dir (str): directory to write the parquet files to.
+            file_prefix (str): prefix of the parquet file names.
+
+        Returns:
+            Dict[int, str]
+                A dictionary of rank -> parquet file path, skipping ranks without a
+                time series. Empty if output_dir is not writable or no parquet
+                engine can be imported.
+        """
+        valid_path_check = is_valid_directory(output_dir, must_be_writable=True)
+        if not valid_path_check.success:
+            logger.error(
+                f"Argument output_dir `{output_dir}` is not a valid output path: {valid_path_check.reason}."
+            )
+            return {}
+        # resolve the engine like to_parquet() does, instead of failing in a worker
+        # after some ranks are written
+        try:
+            pd.io.parquet.get_engine("auto")
+        except ImportError as e:
+            logger.error(
+                f"Writing time series to parquet requires pyarrow or fastparquet: {e}"
+            )
+            return {}
+
+        def write_for_rank(
+            t: "Trace", rank: int, trace_df: Optional[pd.DataFrame]
+        ) -> Optional[str]:
+            time_series = time_series_fn(t, rank, trace_df)
+            if time_series is None:
+                return None
+            # write and release the frame, so memory does not grow with the ranks
+            file_path = os.path.join(output_dir, f"{file_prefix}_rank{rank}.parquet")
+            time_series.to_parquet(file_path, compression="zstd")
+            return file_path
+
+        return TraceCounters._get_time_series_for_ranks(t, ranks, write_for_rank)
+
     @classmethod
     def _get_queue_length_time_series_for_rank(
         cls,
         t: "Trace",
         rank: int,
+        trace_df: Optional[pd.DataFrame] = None,
     ) -> Optional[pd.DataFrame]:
         """
         Returns an (optional) dataframe with time series for the queue length
@@ -33,6 +189,8 @@ class TraceCounters:
         Args:
             t (Trace): Input trace data structure.
             rank (int): rank to generate the time series for.
+            trace_df (pd.DataFrame): optional trace dataframe for the rank; fetched
+                from `t` when not provided.
 
         Returns:
             Optional[pd.DataFrame]
@@ -40,59 +198,84 @@ class TraceCounters:
                 columns: ts (timestamp), pid, tid (of corresponding GPU, stream), stream and
                 queue_length.
 
+                The dataframe is indexed by the event index of the corresponding
+                runtime/kernel event.
+
                 Note that each row or timestamp denotes a change in the value of the
                 time series. The value remains constant until the next timestamp.
                 In essence, it can be thought of as a step function.
         """
         # get trace for a rank
-        trace_df: pd.DataFrame = t.get_trace(rank)
+        if trace_df is None:
+            trace_df = t.get_trace(rank)
 
-        # CUDA Runtime events that may launch kernels
-        # - filter events that have a correlated kernel event only.
-        runtime_calls: pd.DataFrame = trace_df.query(
-            t.symbol_table.get_runtime_launch_events_query()
-        ).copy()
-        runtime_calls.drop(["stream", "pid", "tid"], axis=1, inplace=True)
-        runtime_calls["queue"] = 1
+        # skip traces without any launch symbols, e.g. CPU only traces.
+        launch_event_ids = t.symbol_table.get_runtime_launch_event_ids()
+        if len(launch_event_ids) == 0:
+            return None
 
         # GPU kernel events
-        gpu_kernels = trace_df[trace_df["stream"].ne(-1)].copy()
-        gpu_kernels["queue"] = -1
+        # - only copy the columns needed for the time series.
+        gpu_kernels = trace_df.loc[
+            trace_df["stream"].to_numpy() != -1,
+            ["index", "ts", "stream", "pid", "tid", "correlation"],
+        ]
+        gpu_kernels["queue"] = np.int8(-1)
 
-        # use the pid, tid and cuda stream from the correlated GPU event.
-        runtime_calls_filt = runtime_calls.join(
-            gpu_kernels[["stream", "pid", "tid", "correlation"]].set_index(
-                "correlation"
-            ),
-            on="correlation",
+        # CUDA Runtime events that may launch kernels
+        # - filter events that have a correlated kernel event only.
+        launch_mask = (
+            np.isin(trace_df["name"].to_numpy(), launch_event_ids)
+            & (trace_df["index_correlation"].to_numpy() > 0)
+            & np.isin(
+                trace_df["correlation"].to_numpy(),
+                gpu_kernels["correlation"].to_numpy(),
+            )
         )
+        runtime_calls: pd.DataFrame = trace_df.loc[
+            launch_mask, ["index", "ts", "correlation"]
+        ]
+        runtime_calls["queue"] = np.int8(1)
 
         # filter GPU kernels with valid parent runtime events only, use a semi-join
         gpu_kernels_filt = gpu_kernels[
             gpu_kernels["correlation"].isin(runtime_calls["correlation"])
         ]
 
-        assert len(runtime_calls_filt) == len(gpu_kernels_filt)
+        # use the pid, tid and cuda stream from the correlated GPU event.
+        kernels_by_corr = gpu_kernels_filt[
+            ["stream", "pid", "tid", "correlation"]
+        ].set_index("correlation")
+        if kernels_by_corr.index.is_unique:
+            # one kernel per launch: look the columns up by correlation directly
+            for col in ["stream", "pid", "tid"]:
+                runtime_calls[col] = runtime_calls["correlation"].map(
+                    kernels_by_corr[col]
+                )
+        else:
+            runtime_calls = runtime_calls.join(kernels_by_corr, on="correlation")
+
+        assert len(runtime_calls) == len(gpu_kernels_filt)
 
         # Concat the series of runtime launch events and GPU kernel events
-        merged_df = (
-            pd.concat([runtime_calls_filt, gpu_kernels_filt])
-            .sort_values(by="ts")
-            .set_index("index")
+        merged_df = pd.concat([runtime_calls, gpu_kernels_filt])
+        # argsort the raw timestamps, same ordering as sort_values(by="ts"), and
+        # label the rows by event index as critical path analysis joins on it.
+        merged_df = merged_df.iloc[np.argsort(merged_df["ts"].to_numpy())].set_index(
+            "index"
         )
 
-        result_df_list = []
-        for stream, stream_df in merged_df.groupby("stream"):
-            logger.debug(f"Processing queue_length for rank {rank}, stream {stream}")
-            stream_df["queue_length"] = stream_df["queue"].cumsum()
-            result_df_list.append(stream_df)
+        if merged_df.empty:
+            return None
 
-        return (
-            pd.concat(result_df_list)[["ts", "pid", "tid", "stream", "queue_length"]]
-            if len(result_df_list) > 0
-            else None
+        logger.debug(f"Processing queue_length for rank {rank}")
+        # queue length is bounded by the number of in flight launches, int32 suffices
+        merged_df["queue_length"] = _grouped_cumsum(
+            merged_df["stream"].to_numpy(), merged_df["queue"].to_numpy(), np.int32
         )
 
+        return merged_df[["ts", "pid", "tid", "stream", "queue_length"]]
+
     @classmethod
     def get_queue_length_time_series(
         cls,
@@ -130,17 +313,49 @@ class TraceCounters:
             "stays constant until the next update."
         )
 
-        result = {
-            rank: TraceCounters._get_queue_length_time_series_for_rank(t, rank)
-            for rank in ranks
-        }
-        return dict(filter(lambda x: x[1] is not None, result.items()))
+        return TraceCounters._get_time_series_for_ranks(
+            t, ranks, TraceCounters._get_queue_length_time_series_for_rank
+        )
+
+    @classmethod
+    def write_queue_length_time_series(
+        cls,
+        t: "Trace",
+        output_dir: str,
+        ranks: Optional[List[int]] = None,
+    ) -> Dict[int, str]:
+        """
+        Writes the queue length time series of each rank to
+        `<output_dir>/queue_length_rank<rank>.parquet` instead of holding all of them in
+        memory. Requires a parquet engine (pyarrow or fastparquet).
+
+        Args:
+            t (Trace): Input trace data structure.
+            output_dir (str): directory to write the parquet files to.
+            ranks (list of int): ranks to perform this analysis for.
+
+        Returns:
+            Dict[int, str]:
+                A dictionary of rank -> path of the parquet file with the time series
+                returned by get_queue_length_time_series.
+        """
+        if ranks is None or len(ranks) == 0:
+            ranks = [0]
+
+        return TraceCounters._write_time_series_for_ranks(
+            t,
+            ranks,
+            TraceCounters._get_queue_length_time_series_for_rank,
+            output_dir,
+            "queue_length",
+        )
 
     @classmethod
     def get_queue_length_summary(
         cls,
         t: "Trace",
         ranks: Optional[List[int]] = None,
+        stats: Optional[List[str]] = None,
     ) -> Optional[pd.DataFrame]:
         """
         Returns an (optional) dataframe with queue length statistics per CUDA stream and rank.
@@ -148,6 +363,8 @@ class TraceCounters:
         Args:
             t (Trace): Input trace data structure.
             ranks (list of int): ranks to perform this analysis.
+            stats (list of str): aggregations to compute, e.g. ["count", "mean", "max"].
+                Defaults to None, which computes all the statistics of describe().
 
         Returns:
             Optional[pd.DataFrame]
@@ -157,23 +374,28 @@ class TraceCounters:
         if ranks is None or len(ranks) == 0:
             ranks = [0]
 
-        results_list: List[pd.DataFrame] = []
+        time_series = TraceCounters.get_queue_length_time_series(t, ranks)
+        if len(time_series) == 0:
+            return None
 
-        for rank, rank_df in TraceCounters.get_queue_length_time_series(
-            t, ranks
-        ).items():
-            rank_df["rank"] = rank
-            result = (
-                rank_df[["rank", "stream", "queue_length"]]
-                .groupby(["rank", "stream"])
-                .describe()
-            )
-            results_list.append(result)
-        return pd.concat(results_list) if len(results_list) > 0 else None
+        # summarize all ranks with a single groupby
+        all_ranks_df = pd.concat(
+            [
+                rank_df[["stream", "queue_length"]].assign(rank=rank)
+                for rank, rank_df in time_series.items()
+            ]
+        )
+        grouped = all_ranks_df[["rank", "stream", "queue_length"]].groupby(
+            ["rank", "stream"]
+        )
+        return grouped.describe() if stats is None else grouped.agg(stats)
 
     @classmethod
     def _get_memory_bw_time_series_for_rank(
-        cls, t: "Trace", rank: int
+        cls,
+        t: "Trace",
+        rank: int,
+        trace_df: Optional[pd.DataFrame] = None,
     ) -> Optional[pd.DataFrame]:
         """
         Returns time series for the memory bandwidth of memory copy and memory set operations
@@ -182,6 +404,8 @@ class TraceCounters:
         Args:
             t (Trace): Input trace data structure.
             rank (int): rank to generate the time series for.
+            trace_df (pd.DataFrame): optional trace dataframe for the rank; fetched
+                from `t` when not provided.
 
         Returns:
             Optional[pd.DataFrame]
@@ -191,52 +415,61 @@ class TraceCounters:
                 and memory_bw_gbps (memory bandwidth in GB/sec).
         """
         # get trace for a rank
-        trace_df: pd.DataFrame = t.get_trace(rank)
+        if trace_df is None:
+            trace_df = t.get_trace(rank)
         sym_table = t.symbol_table.get_sym_table()
 
-        gpu_kernels = trace_df[trace_df["stream"].ne(-1)].copy()
-        gpu_kernels["kernel_type"] = gpu_kernels[["name"]].apply(
-            lambda x: get_kernel_type(sym_table[x["name"]]), axis=1
-        )
+        names = trace_df["name"].to_numpy()
+        is_gpu_kernel = trace_df["stream"].to_numpy() != -1
+        # classify each unique kernel symbol once instead of every row
+        memory_kernel_ids = [
+            sym_id
+            for sym_id in np.unique(names[is_gpu_kernel])
+            if get_kernel_type(sym_table[sym_id]) == KernelType.MEMORY.name
+        ]
+        if len(memory_kernel_ids) == 0:
+            return None
 
-        memcpy_kernels = gpu_kernels[
-            gpu_kernels.kernel_type == KernelType.MEMORY.name
-        ].copy()
-        memcpy_kernels["name"] = memcpy_kernels[["name"]].apply(
-            lambda x: get_memory_kernel_type(sym_table[x["name"]]), axis=1
+        # only copy the columns needed for the time series
+        memcpy_kernels = trace_df.loc[
+            is_gpu_kernel & np.isin(names, memory_kernel_ids),
+            ["ts", "dur", "pid", "name", "memory_bw_gbps"],
+        ]
+        memory_kernel_type_map = {
+            sym_id: get_memory_kernel_type(sym_table[sym_id])
+            for sym_id in memcpy_kernels["name"].unique()
+        }
+        # few distinct memory op types, group on their category codes
+        memory_kernel_types = pd.Categorical(
+            memcpy_kernels["name"].map(memory_kernel_type_map)
         )
 
         # In case of 0 us duration events round it up to 1 us to avoid -ve values
         # see https://github.com/facebookresearch/HolisticTraceAnalysis/issues/20
-        memcpy_kernels.loc[memcpy_kernels.dur == 0, ["dur"]] = 1
-
-        membw_time_series_a = memcpy_kernels[["ts", "name", "pid", "memory_bw_gbps"]]
-        membw_time_series_b = memcpy_kernels[
-            ["ts", "name", "dur", "pid", "memory_bw_gbps"]
-        ].copy()
-
-        # The end events have timestamps = start timestamp + duration
-        membw_time_series_b.ts = membw_time_series_b.ts + membw_time_series_b.dur
-        membw_time_series_b.memory_bw_gbps = -membw_time_series_b.memory_bw_gbps
-
-        membw_time_series = pd.concat(
-            [
-                membw_time_series_a,
-                membw_time_series_b[["ts", "pid", "name", "memory_bw_gbps"]],
-            ],
-            ignore_index=True,
-        ).sort_values(by="ts")
-
-        result_df_list = []
-        for _, membw_df in membw_time_series.groupby("name"):
-            membw_df.memory_bw_gbps = membw_df.memory_bw_gbps.cumsum()
-            result_df_list.append(membw_df)
-
-        if len(result_df_list) == 0:
-            return None
-
-        result_df = pd.concat(result_df_list)[["ts", "pid", "name", "memory_bw_gbps"]]
-        return result_df
+        dur = np.maximum(memcpy_kernels["dur"].to_numpy(), 1)
+
+        # Each memory op contributes a start event (+bw) followed by an end event
+        # (-bw) with timestamp = start timestamp + duration; build both halves at once.
+        start_ts = memcpy_kernels["ts"].to_numpy()
+        ts = np.concatenate([start_ts, start_ts + dur])
+        memory_bw_gbps = memcpy_kernels["memory_bw_gbps"].to_numpy()
+        order = np.argsort(ts)
+        memory_kernel_type_codes = np.tile(memory_kernel_types.codes, 2)[order]
+
+        # accumulate on the arrays so the result frame is built once, as returned
+        return pd.DataFrame(
+            {
+                "ts": ts[order],
+                "pid": np.tile(memcpy_kernels["pid"].to_numpy(), 2)[order],
+                "name": pd.Categorical.from_codes(
+                    memory_kernel_type_codes, memory_kernel_types.categories
+                ),
+                "memory_bw_gbps": _grouped_cumsum(
+                    memory_kernel_type_codes,
+                    np.concatenate([memory_bw_gbps, -memory_bw_gbps])[order],
+                ),
+            }
+        )
 
     @classmethod
     def get_memory_bw_time_series(
@@ -266,17 +499,49 @@ class TraceCounters:
             "when the value changes. Once a values is observed the time series "
             "stays constant until the next update."
         )
-        result = {
-            rank: TraceCounters._get_memory_bw_time_series_for_rank(t, rank)
-            for rank in ranks
-        }
-        return dict(filter(lambda x: x[1] is not None, result.items()))
+        return TraceCounters._get_time_series_for_ranks(
+            t, ranks, TraceCounters._get_memory_bw_time_series_for_rank
+        )
+
+    @classmethod
+    def write_memory_bw_time_series(
+        cls,
+        t: "Trace",
+        output_dir: str,
+        ranks: Optional[List[int]] = None,
+    ) -> Dict[int, str]:
+        """
+        Writes the memory bandwidth time series of each rank to
+        `<output_dir>/memory_bw_rank<rank>.parquet` instead of holding all of them in
+        memory. Requires a parquet engine (pyarrow or fastparquet).
+
+        Args:
+            t (Trace): Input trace data structure.
+            output_dir (str): directory to write the parquet files to.
+            ranks (list of int): ranks to perform this analysis for.
+
+        Returns:
+            Dict[int, str]
+                Returns a dictionary of rank -> path of the parquet file with the time
+                series returned by get_memory_bw_time_series.
+        """
+        if ranks is None or len(ranks) == 0:
+            ranks = [0]
+
+        return TraceCounters._write_time_series_for_ranks(
+            t,
+            ranks,
+            TraceCounters._get_memory_bw_time_series_for_rank,
+            output_dir,
+            "memory_bw",
+        )
 
     @classmethod
     def get_memory_bw_summary(
         cls,
         t: "Trace",
         ranks: Optional[List[int]] = None,
+        stats: Optional[List[str]] = None,
     ) -> Optional[pd.DataFrame]:
         """
         Returns an (optional) dataframe containing the summary statistics of memory ops. The
@@ -285,6 +550,8 @@ class TraceCounters:
         Args:
             t (Trace): Input trace data structure.
             ranks (list of int): ranks to perform this analysis for.
+            stats (list of str): aggregations to compute, e.g. ["count", "mean", "max"].
+                Defaults to None, which computes all the statistics of describe().
 
         Returns:
             Optional[pd.DataFrame]
@@ -294,17 +561,21 @@ class TraceCounters:
         if ranks is None or len(ranks) == 0:
             ranks = [0]
 
-        results_list: List[pd.DataFrame] = []
+        time_series = TraceCounters.get_memory_bw_time_series(t, ranks)
+        if len(time_series) == 0:
+            return None
 
-        for rank, rank_df in TraceCounters.get_memory_bw_time_series(t, ranks).items():
-            rank_df["rank"] = rank
-            # Exclude the 0 points in time series
-            rank_df = rank_df[rank_df.memory_bw_gbps > 0]
+        # summarize all ranks with a single groupby
+        all_ranks_df = pd.concat(
+            [
+                rank_df[["name", "memory_bw_gbps"]].assign(rank=rank)
+                for rank, rank_df in time_series.items()
+            ]
+        )
+        # Exclude the 0 points in time series
+        all_ranks_df = all_ranks_df[all_ranks_df.memory_bw_gbps > 0]
 
-            result = (
-                rank_df[["rank", "name", "memory_bw_gbps"]]
-                .groupby(["rank", "name"])
-                .describe()
-            )
-            results_list.append(result)
-        return pd.concat(results_list) if len(results_list) > 0 else None
+        grouped = all_ranks_df[["rank", "name", "memory_bw_gbps"]].groupby(
+            ["rank", "name"], observed=True
+        )
+        return grouped.describe() if stats is None else grouped.agg(stats)
@@ -27,6 +27,13 @@ MetaData = Dict[str, Any]
 PHASE_COUNTER: str = "C"
 PHASE_FLOW_START: str = "s"
 PHASE_FLOW_END: str = "f"
+RUNTIME_LAUNCH_EVENT_NAMES: List[str] = [
+    "cudaLaunchKernel",
+    "cudaLaunchKernelExC",
+    "cuLaunchKernel",
+    "cudaMemcpyAsync",
+    "cudaMemsetAsync",
+]
 
 
 class _SymbolCollector:
@@ -89,9 +96,11 @@ class TraceSymbolTable:
         self.add_symbols(all_symbols)
 
     def get_sym_id_map(self) -> Dict[str, int]:
+        """Returns the symbol -> id map shared by all ranks (not a copy)."""
         return self.sym_index
 
     def get_sym_table(self) -> List[str]:
+        """Returns the id -> symbol list shared by all ranks (not a copy)."""
         return self.sym_table
 
     def add_symbols_to_trace_df(self, trace_df: pd.DataFrame, col: str) -> None:
@@ -148,20 +157,23 @@ class TraceSymbolTable:
         """Check if an event is a CPU operator"""
         return trace_df["cat"].loc[idx] == self.sym_index["cpu_op"]
 
+    def get_runtime_launch_event_ids(self) -> List[int]:
+        """Returns the symbol ids of the CUDA runtime kernel and memcpy launch
+        events present in this table."""
+        return [
+            self.sym_index[sym]
+            for sym in RUNTIME_LAUNCH_EVENT_NAMES
+            if sym in self.sym_index
+        ]
+
     def get_runtime_launch_events_query(self) -> str:
         """Returns a SQL query you can pass to trace dataframe query()
         to filter events that are CUDA runtime kernel and memcpy launches."""
-        cudaLaunchKernel_id = self.sym_index.get("cudaLaunchKernel", -128)
-        cudaLaunchKernelExC_id = self.sym_index.get("cudaLaunchKernelExC", -128)
-        cuLaunchKernel_id = self.sym_index.get("cuLaunchKernel", -128)
-        cudaMemcpyAsync_id = self.sym_index.get("cudaMemcpyAsync", -128)
-        cudaMemsetAsync_id = self.sym_index.get("cudaMemsetAsync", -128)
-
-        return (
-            f"((name == {cudaMemsetAsync_id}) or (name == {cudaMemcpyAsync_id}) or "
-            f" (name == {cudaLaunchKernel_id}) or (name == {cudaLaunchKernelExC_id})"
-            f" or (name == {cuLaunchKernel_id})) and (index_correlation > 0)"
+        name_conditions = " or ".join(
+            f"(name == {self.sym_index.get(sym, -128)})"
+            for sym in RUNTIME_LAUNCH_EVENT_NAMES
         )
+        return f"({name_conditions}) and (index_correlation > 0)"
 
 
 def parse_trace_dict(trace_file_path: str) -> Dict[str, Any]:
@@ -338,6 +338,7 @@ class TraceAnalysis:
     def get_queue_length_summary(
         self,
         ranks: Optional[List[int]] = None,
+        stats: Optional[List[str]] = None,
     ) -> Optional[pd.DataFrame]:
         r"""
         Queue length is defined as the number of outstanding CUDA operations on a stream. This
@@ -346,6 +347,8 @@ class TraceAnalysis:
 
         Args:
             ranks (List[int]): List of ranks for which to queue length summary is calculated. Default = [0].
+            stats (List[str]): List of statistics to calculate, e.g. ["count", "mean", "max"]. Computing only
+                a subset skips the percentile calculations. Default = None, which calculates all of them.
 
         Returns:
             pd.DataFrame or None
@@ -353,7 +356,7 @@ class TraceAnalysis:
                 min, max, standard deviation, 25th, 50th and 75th percentiles.
                 The function returns None when the dataframe is empty.
         """
-        return TraceCounters.get_queue_length_summary(self.t, ranks)
+        return TraceCounters.get_queue_length_summary(self.t, ranks, stats)
 
     def get_queue_length_time_series(
         self,
@@ -375,9 +378,31 @@ class TraceAnalysis:
         """
         return TraceCounters.get_queue_length_time_series(self.t, ranks)
 
+    def write_queue_length_time_series(
+        self,
+        output_dir: str,
+        ranks: Optional[List[int]] = None,
+    ) -> Dict[int, str]:
+        r"""
+        Writes the queue length time series of each rank to a parquet file (queue_length_rank<rank>.parquet)
+        instead of holding all of them in memory. Requires pyarrow or fastparquet to be installed.
+
+        Args:
+            output_dir (str): Directory to write the parquet files to.
+            ranks (List[int]): List of ranks for which the queue length time series is generated. Default = [0].
+
+        Returns:
+            Dict[int, str]
+                Returns a dictionary whose key is the rank and value is the path of the parquet file with the
+                dataframe returned by ``get_queue_length_time_series``. The dictionary is empty if output_dir
+                is not writable or no parquet engine is available.
+        """
+        return TraceCounters.write_queue_length_time_series(self.t, output_dir, ranks)
+
     def get_memory_bw_summary(
         self,
         ranks: Optional[List[int]] = None,
+        stats: Optional[List[str]] = None,
     ) -> pd.DataFrame:
         r"""
         Summarizes the memory bandwidth statistics for memory copy and memset operations. This includes memory
@@ -386,6 +411,8 @@ class TraceAnalysis:
 
         Args:
             ranks (List[int]): List of ranks for which memory bandwidth is calculated. Default = [0].
+            stats (List[str]): List of statistics to calculate, e.g. ["count", "mean", "max"]. Computing only
+                a subset skips the percentile calculations. Default = None, which calculates all of them.
 
         Returns:
             pd.DataFrame or None
@@ -393,7 +420,7 @@ class TraceAnalysis:
                 25th, 50th and 75th percentiles of memory copy/memset operations.
                 The function returns None when the dataframe is empty.
         """
-        return TraceCounters.get_memory_bw_summary(self.t, ranks)
+        return TraceCounters.get_memory_bw_summary(self.t, ranks, stats)
 
     def get_memory_bw_time_series(
         self,
@@ -415,6 +442,27 @@ class TraceAnalysis:
         """
         return TraceCounters.get_memory_bw_time_series(self.t, ranks)
 
+    def write_memory_bw_time_series(
+        self,
+        output_dir: str,
+        ranks: Optional[List[int]] = None,
+    ) -> Dict[int, str]:
+        r"""
+        Writes the memory bandwidth time series of each rank to a parquet file (memory_bw_rank<rank>.parquet)
+        instead of holding all of them in memory. Requires pyarrow or fastparquet to be installed.
+
+        Args:
+            output_dir (str): Directory to write the parquet files to.
+            ranks (List[int]): List of ranks for which the memory bandwidth time series is generated. Default = [0].
+
+        Returns:
+            Dict[int, str]
+                Returns a dictionary whose key is the rank and value is the path of the parquet file with the
+                dataframe returned by ``get_memory_bw_time_series``. The dictionary is empty if output_dir
+                is not writable or no parquet engine is available.
+        """
+        return TraceCounters.write_memory_bw_time_series(self.t, output_dir, ranks)
+
     def get_idle_time_breakdown(
         self,
         ranks: Optional[List[int]] = None,
@@ -70,6 +70,17 @@ class TraceSymbolTableTestCase(unittest.TestCase):
         ]
         self.assertTrue(all(is_consistent))
 
+    def test_get_runtime_launch_event_ids(self):
+        st = TraceSymbolTable()
+        st.add_symbols(["aten::mm", "cudaLaunchKernel", "cudaMemcpyAsync", "b"])
+        sym_id_map = st.get_sym_id_map()
+
+        self.assertListEqual(
+            st.get_runtime_launch_event_ids(),
+            [sym_id_map["cudaLaunchKernel"], sym_id_map["cudaMemcpyAsync"]],
+        )
+        self.assertListEqual(TraceSymbolTable().get_runtime_launch_event_ids(), [])
+
 
 if __name__ == "__main__":  # pragma: no cover
     unittest.main()
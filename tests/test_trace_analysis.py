@@ -3,14 +3,17 @@
 # LICENSE file in the root directory of this source tree.
 
 
+import importlib.util
 import os
 import unittest
 from collections import namedtuple
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from typing import List
 from unittest.mock import patch
 
 import hta
+import pandas as pd
 from hta.common.trace import PHASE_COUNTER
 from hta.trace_analysis import TimeSeriesTypes, TraceAnalysis
 
@@ -256,6 +259,71 @@ class TraceAnalysisTestCase(unittest.TestCase):
                 msg=f"Stream 7 stats mismatch key={key}",
             )
 
+    def test_get_queue_length_summary_stats(self):
+        qd_summary = self.vision_transformer_t.get_queue_length_summary(
+            ranks=[0], stats=["count", "mean", "max"]
+        )
+        self.assertListEqual(
+            qd_summary.columns.to_list(),
+            [
+                ("queue_length", "count"),
+                ("queue_length", "mean"),
+                ("queue_length", "max"),
+            ],
+        )
+
+        stream7_stats = qd_summary.loc[0, 7]["queue_length"].to_dict()
+        self.assertEqual(stream7_stats["count"], 17160)
+        self.assertAlmostEqual(stream7_stats["mean"], 61.043473193, places=3)
+        self.assertEqual(stream7_stats["max"], 403)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow not installed")
+    def test_write_time_series(self):
+        with TemporaryDirectory() as tmpdir:
+            queue_len_files = self.vision_transformer_t.write_queue_length_time_series(
+                output_dir=tmpdir, ranks=[0, 1]
+            )
+            self.assertEqual(
+                queue_len_files,
+                {
+                    rank: os.path.join(tmpdir, f"queue_length_rank{rank}.parquet")
+                    for rank in [0, 1]
+                },
+            )
+            membw_files = self.vision_transformer_t.write_memory_bw_time_series(
+                output_dir=tmpdir, ranks=[0]
+            )
+            self.assertEqual(
+                membw_files, {0: os.path.join(tmpdir, "memory_bw_rank0.parquet")}
+            )
+
+            queue_len_ts = self.vision_transformer_t.get_queue_length_time_series(
+                ranks=[0]
+            )[0]
+            # object pid/tid columns are read back as int64
+            pd.testing.assert_frame_equal(
+                pd.read_parquet(queue_len_files[0]), queue_len_ts, check_dtype=False
+            )
+
+        self.assertEqual(
+            self.vision_transformer_t.write_queue_length_time_series(
+                output_dir="/non/existent/dir", ranks=[0]
+            ),
+            {},
+        )
+
+    @patch("pandas.io.parquet.get_engine", side_effect=ImportError)
+    def test_write_time_series_without_parquet_engine(self, mock_get_engine):
+        with TemporaryDirectory() as tmpdir:
+            self.assertEqual(
+                self.vision_transformer_t.write_queue_length_time_series(
+                    output_dir=tmpdir, ranks=[0, 1]
+                ),
+                {},
+            )
+            self.assertListEqual(os.listdir(tmpdir), [])
+        mock_get_engine.assert_called_once()
+
     @patch.object(hta.common.trace.Trace, "write_raw_trace")
     def test_generate_trace_with_counters(self, mock_write_trace):
         # Use a trace with some kernels missing attribution to operators
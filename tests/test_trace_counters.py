@@ -0,0 +1,68 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from hta.analyzers import _numba_kernels
+from hta.analyzers.trace_counters import _grouped_cumsum
+
+
+class TestGroupedCumsum(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.keys = rng.choice([7, 20, 24, 26], size=1000)
+        self.values = rng.choice([-1, 1], size=1000)
+        self.expected = pd.Series(self.values).groupby(self.keys).cumsum().to_numpy()
+
+    def test_grouped_cumsum_numpy(self) -> None:
+        with patch.object(_numba_kernels, "HAS_NUMBA", False):
+            result = _grouped_cumsum(self.keys, self.values)
+        np.testing.assert_array_equal(result, self.expected)
+
+    @unittest.skipUnless(_numba_kernels.HAS_NUMBA, "numba is not installed")
+    def test_grouped_cumsum_numba(self) -> None:
+        result = _grouped_cumsum(self.keys, self.values)
+        np.testing.assert_array_equal(result, self.expected)
+
+    def test_grouped_cumsum_narrow_values(self) -> None:
+        keys = np.array([7] * 300 + [20] * 300, dtype=np.int8)
+        values = np.ones(600, dtype=np.int8)
+        expected = np.concatenate([np.arange(1, 301), np.arange(1, 301)])
+        for has_numba in {False, _numba_kernels.HAS_NUMBA}:
+            with patch.object(_numba_kernels, "HAS_NUMBA", has_numba):
+                result = _grouped_cumsum(keys, values, np.int32)
+            self.assertEqual(result.dtype, np.int32)
+            np.testing.assert_array_equal(result, expected)
+
+    def test_grouped_cumsum_string_keys(self) -> None:
+        keys = np.array(
+            ["Memset", "Memcpy HtoD", "Memset", "Memcpy HtoD"], dtype=object
+        )
+        values = np.array([1.5, 2.0, -1.5, -2.0])
+        np.testing.assert_array_equal(
+            _grouped_cumsum(keys, values), np.array([1.5, 2.0, 0.0, 0.0])
+        )
+
+    def test_grouped_cumsum_float_exact(self) -> None:
+        # round-off from one group must not leak into the next one
+        keys = np.array([0, 0, 0, 0, 1, 1, 1, 1])
+        values = np.array([7.35, 1.14, -7.35, -1.14, 3.91, 5.17, -3.91, -5.17])
+        # same as running Series.cumsum() on each group separately
+        expected = np.concatenate([np.cumsum(values[:4]), np.cumsum(values[4:])])
+        self.assertListEqual(expected[4:].tolist(), [3.91, 9.08, 5.17, 0.0])
+        for has_numba in {False, _numba_kernels.HAS_NUMBA}:
+            with patch.object(_numba_kernels, "HAS_NUMBA", has_numba):
+                result = _grouped_cumsum(keys, values)
+            np.testing.assert_array_equal(result, expected)
+
+    def test_grouped_cumsum_empty(self) -> None:
+        self.assertEqual(len(_grouped_cumsum(np.array([]), np.array([]))), 0)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()